@@ -0,0 +1,265 @@
+"""
+Numba-compiled scalar cores of the simple stats detectors.
+
+There are two kinds of kernel, both taking the detector's precomputed logistic
+coefficients (invScale, bias):
+
+- per-record steps (zscoreStep, adaptiveStep) take the detector state as plain
+  floats/ints plus preallocated float64/int64 buffers, and return the record's
+  anomaly score together with the updated scalar state;
+- whole-array scans (zscoreScan, ewmaScan, adaptiveScan) score a float64 array
+  of values and return a float32 array of scores, as scoreArray() does.
+
+Only the arithmetic is compiled; the AnomalyDetector wrappers in
+`simple_stats_detectors` stay regular Python.
+
+Importing this module raises ImportError if numba is not installed, in which
+case the detectors use their pure-Python implementations.
+"""
+import math
+import numpy
+
+from numba import njit
+
+
+
+# fastmath without the "no NaN / no Inf" assumptions, so the isfinite() guard
+# in logisticFromX is not optimized away.
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def logisticFromX(x):
+  """Compiled equivalent of simple_stats_detectors._logisticFromX()."""
+  if not math.isfinite(x):
+    return 0.0
+
+  return 0.5 + 0.5 * math.tanh(0.5 * x)
+
+
+
+# The Welford-style updates below are compiled without fastmath: reassociation
+# would undo the cancellation-free ordering they rely on.
+
+@njit(cache=True)
+def zscoreStep(buf, head, count, mean, m2, shadowMean, shadowM2, value,
+               windowSize, invScale, bias, minStd):
+  """
+  One ZScoreDetector record: score `value` against the window mean and M2,
+  then push it into the ring buffer `buf` with a windowed Welford update.
+  shadowMean/shadowM2 accumulate the values written since `head` last wrapped
+  and replace mean/m2 whenever it wraps.
+
+  Mirrors ZScoreDetector._handleRecordPython() and the pure-Python loop of
+  ZScoreDetector.scoreArray(); keep the three in step.
+
+  @return (score, head, count, mean, m2, shadowMean, shadowM2)
+  """
+  score = 0.0
+
+  if count == windowSize:
+    std = math.sqrt(max(m2 / windowSize, minStd * minStd))
+
+    z = abs((value - mean) / std)
+    score = logisticFromX(z * invScale + bias)
+
+    old = buf[head]
+    delta = value - old
+    newMean = mean + delta / windowSize
+    m2 += delta * (value - newMean + old - mean)
+    mean = newMean
+  else:
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+
+  delta = value - shadowMean
+  shadowMean += delta / (head + 1)
+  shadowM2 += delta * (value - shadowMean)
+
+  buf[head] = value
+  head += 1
+  if head == windowSize:
+    head = 0
+    mean = shadowMean
+    m2 = shadowM2
+    shadowMean = 0.0
+    shadowM2 = 0.0
+
+  return score, head, count, mean, m2, shadowMean, shadowM2
+
+
+
+@njit(cache=True)
+def zscoreScan(values, windowSize, invScale, bias, minStd, probation):
+  """
+  ZScoreDetector.scoreArray(): zscoreStep() over all of `values` in one
+  compiled loop, with the first `probation` records scored 0.
+
+  @return float32 array of scores
+  """
+  scores = numpy.zeros(len(values), dtype=numpy.float32)
+  buf = numpy.zeros(windowSize)
+  head = 0
+  count = 0
+  mean = 0.0
+  m2 = 0.0
+  shadowMean = 0.0
+  shadowM2 = 0.0
+
+  for i in range(len(values)):
+    score, head, count, mean, m2, shadowMean, shadowM2 = zscoreStep(
+      buf, head, count, mean, m2, shadowMean, shadowM2, values[i], windowSize,
+      invScale, bias, minStd)
+    if i >= probation:
+      scores[i] = score
+
+  return scores
+
+
+
+@njit(cache=True)
+def ewmaScan(values, alpha, invScale, bias, minStd, probation):
+  """
+  EwmaDetector.scoreArray(): the EWMA, variance and score recursions fused
+  into one compiled pass over `values`. The first two records (EWMA
+  initialization and variance seeding) and the first `probation` records score
+  0.
+
+  Mirrors EwmaDetector.handleRecord() and the pure-Python loop of
+  EwmaDetector.scoreArray(); keep the three in step.
+
+  @return float32 array of scores
+  """
+  scores = numpy.zeros(len(values), dtype=numpy.float32)
+  if len(values) < 2:
+    return scores
+
+  ewma = values[0]
+  diff = values[1] - ewma
+  ewma += alpha * diff
+  variance = diff * diff
+
+  for i in range(2, len(values)):
+    diff = values[i] - ewma
+    std = math.sqrt(variance)
+    if std < minStd:
+      std = minStd
+
+    if i >= probation:
+      scores[i] = logisticFromX(abs(diff) / std * invScale + bias)
+
+    ewma += alpha * diff
+    variance = (1.0 - alpha) * (variance + alpha * diff * diff)
+
+  return scores
+
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def adaptiveStep(buf, maxQ, minQ, qPtr, s, shadow, value, index,
+                 windowSize, invScale, bias, minDev):
+  """
+  One AdaptiveThresholdDetector record.
+
+  `buf` is the ring buffer of the last windowSize values, `index` the number of
+  records seen so far. `maxQ` and `minQ` are monotonic queues of record indices
+  stored circularly (capacity windowSize); `qPtr` holds their
+  [maxFront, maxBack, minFront, minBack] counters and is updated in place.
+  `shadow` sums the values written since the buffer last wrapped and replaces
+  the running sum `s` whenever it wraps.
+
+  Mirrors AdaptiveThresholdDetector._handleRecordPython() and the pure-Python
+  loop of AdaptiveThresholdDetector.scoreArray(); keep the three in step.
+
+  @return (score, s, shadow)
+  """
+  score = 0.0
+  slot = index % windowSize
+  maxFront, maxBack, minFront, minBack = qPtr[0], qPtr[1], qPtr[2], qPtr[3]
+
+  if index >= windowSize:
+    mean = s / windowSize
+    windowMax = buf[maxQ[maxFront % windowSize] % windowSize]
+    windowMin = buf[minQ[minFront % windowSize] % windowSize]
+    maxDev = max(windowMax - mean, mean - windowMin)
+    if maxDev < minDev:
+      maxDev = minDev
+
+    score = logisticFromX(abs(value - mean) / maxDev * invScale + bias)
+    s += value - buf[slot]
+
+    # Drop the record leaving the window before its slot is overwritten.
+    if maxQ[maxFront % windowSize] <= index - windowSize:
+      maxFront += 1
+    if minQ[minFront % windowSize] <= index - windowSize:
+      minFront += 1
+  else:
+    s += value
+
+  buf[slot] = value
+  shadow += value
+  if slot == windowSize - 1:
+    s = shadow
+    shadow = 0.0
+
+  while (maxBack > maxFront
+         and buf[maxQ[(maxBack - 1) % windowSize] % windowSize] < value):
+    maxBack -= 1
+  maxQ[maxBack % windowSize] = index
+  maxBack += 1
+
+  while (minBack > minFront
+         and buf[minQ[(minBack - 1) % windowSize] % windowSize] > value):
+    minBack -= 1
+  minQ[minBack % windowSize] = index
+  minBack += 1
+
+  qPtr[0], qPtr[1], qPtr[2], qPtr[3] = maxFront, maxBack, minFront, minBack
+  return score, s, shadow
+
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def adaptiveScan(values, windowSize, invScale, bias, minDev, probation):
+  """
+  AdaptiveThresholdDetector.scoreArray(): adaptiveStep() over all of `values`
+  in one compiled loop, with the first `probation` records scored 0.
+
+  @return float32 array of scores
+  """
+  scores = numpy.zeros(len(values), dtype=numpy.float32)
+  buf = numpy.zeros(windowSize)
+  maxQ = numpy.zeros(windowSize, dtype=numpy.int64)
+  minQ = numpy.zeros(windowSize, dtype=numpy.int64)
+  qPtr = numpy.zeros(4, dtype=numpy.int64)
+  s = 0.0
+  shadow = 0.0
+
+  for i in range(len(values)):
+    score, s, shadow = adaptiveStep(buf, maxQ, minQ, qPtr, s, shadow,
+                                    values[i], i, windowSize, invScale, bias,
+                                    minDev)
+    if i >= probation:
+      scores[i] = score
+
+  return scores
+
+
+
+def warmup():
+  """
+  Compile (or load from numba's on-disk cache) the whole-array kernels used by
+  the detectors' scoreArray(), by calling them once on dummy data. The
+  per-record kernels are compiled on first use instead.
+
+  Call this in the parent process before creating a multiprocessing pool, so
+  forked workers inherit the compiled kernels instead of each compiling them.
+  """
+  values = numpy.zeros(1)
+
+  zscoreScan(values, 1, 1.0, 0.0, 1e-6, 0)
+  ewmaScan(values, 0.1, 1.0, 0.0, 1e-6, 0)
+  adaptiveScan(values, 1, 1.0, 0.0, 1e-6, 0)
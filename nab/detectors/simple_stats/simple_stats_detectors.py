@@ -4,171 +4,665 @@ Simple streaming baseline detectors for NAB.
 These are implemented as NAB-native detectors (subclasses of AnomalyDetector),
 so they can be run via `run.py` like any other detector.
 """
+import array
 from collections import deque
 import math
+import numpy
 import os
 
 from nab.detectors.base import AnomalyDetector
 
+# The numba-compiled kernels are optional; without numba the detectors run
+# their pure-Python implementations.
+try:
+  from nab.detectors.simple_stats import _kernels
+except ImportError:
+  _kernels = None
+
 
 
 def _logisticScore(metric, center, scale):
   """
   Convert a non-negative anomaly metric (e.g. z-score) into a [0, 1] anomaly
   score. `center` controls where the score crosses 0.5.
+
+  Uses 1 / (1 + exp(-x)) == 0.5 + 0.5 * tanh(x / 2): tanh saturates to +/-1 by
+  itself, so no overflow guards are needed.
+
+  `metric` may also be a NumPy array of metrics; those scores are computed
+  vectorized in float32, since the scores only get thresholded.
   """
+  if scale is None or scale <= 0:
+    scale = 1.0
+
+  if isinstance(metric, numpy.ndarray):
+    x = ((metric - center) / scale).astype(numpy.float32, copy=False)
+    scores = 0.5 + 0.5 * numpy.tanh(0.5 * x)
+    scores[~numpy.isfinite(metric)] = 0.0
+    return scores
+
   if metric is None or not math.isfinite(metric):
     return 0.0
 
+  return 0.5 + 0.5 * math.tanh(0.5 * (metric - center) / scale)
+
+
+
+def _logisticCoefficients(center, scale):
+  """
+  Returns (invScale, bias) such that x = metric * invScale + bias is the
+  logistic input used by _logisticScore(metric, center, scale). Detectors
+  precompute these so the per-record path does no division.
+  """
   if scale is None or scale <= 0:
     scale = 1.0
 
-  x = (metric - center) / scale
+  return 1.0 / scale, -center / scale
+
 
-  # Avoid exp() overflow.
-  if x >= 60.0:
-    return 1.0
-  if x <= -60.0:
+
+def _logisticFromX(x):
+  """Logistic of a precomputed input x; non-finite inputs score 0."""
+  if not math.isfinite(x):
     return 0.0
 
-  return 1.0 / (1.0 + math.exp(-x))
+  return 0.5 + 0.5 * math.tanh(0.5 * x)
+
+
+
+def _ringBuffer(size):
+  """
+  Returns a zeroed float64 ring buffer with `size` slots: a NumPy array for the
+  numba kernels, or an array.array of unboxed C doubles for the pure-Python
+  path, whose items read back as plain floats instead of NumPy scalars.
+  """
+  if _kernels is not None:
+    return numpy.zeros(size)
+
+  return array.array("d", bytes(8 * size))
+
+
+
+class _BatchAnomalyDetector(AnomalyDetector):
+  """
+  AnomalyDetector that scores a whole data file with one handleBatch() call
+  instead of looping over the rows with handleRecord().
+
+  handleRecord() remains available as the streaming implementation; both must
+  produce the same scores up to floating point error.
+
+  Subclass handleRecord() implementations do not check the probationary
+  period themselves: for the first probationaryPeriod records the instance's
+  handleRecord is _handleRecordProbation(), which updates the detector state
+  with the class's handleRecord() but reports zero scores, and then removes
+  itself so later records dispatch straight to the class's method.
+
+  Detectors whose scores only depend on the values and their parameters also
+  provide a classmethod scoreArray(values, probation, **params), which scores
+  a plain array without constructing a detector or a data file. It returns the
+  float32 anomaly scores of the 1-D float64 array `values`, with the first
+  `probation` records scored 0. Parameters not given in `params` are read from
+  the environment, see _parameters(); unknown ones raise a TypeError.
+  """
+
+  # AnomalyDetector has no __slots__, so instances keep a __dict__ (which
+  # holds the instance handleRecord override); the per-record state of the
+  # subclasses lives in slots.
+  __slots__ = ("_probationLeft", )
+
+  def __init__(self, *args, **kwargs):
+    super(_BatchAnomalyDetector, self).__init__(*args, **kwargs)
+
+    for name, value in self._parameters().items():
+      setattr(self, name, value)
+
+    self._probationLeft = math.ceil(self.probationaryPeriod)
+    if self._probationLeft > 0:
+      self.handleRecord = self._handleRecordProbation
+
+
+  def _handleRecordProbation(self, inputData):
+    detectorValues = type(self).handleRecord(self, inputData)
+
+    self._probationLeft -= 1
+    if self._probationLeft == 0:
+      del self.handleRecord
+
+    return (0.0, ) * len(detectorValues)
+
+
+  @staticmethod
+  def _parameters():
+    """
+    Returns a dict of the detector's tunable parameters, read from the
+    environment; they are set as instance attributes of the same names.
+    """
+    return {}
+
+
+  @classmethod
+  def _scoreParameters(cls, params):
+    """
+    Returns the parameters for scoreArray(): _parameters() updated with
+    `params`, which may only name parameters listed there.
+    """
+    parameters = cls._parameters()
 
+    unknown = sorted(set(params) - set(parameters))
+    if unknown:
+      raise TypeError("%s.scoreArray() got unexpected parameter(s): %s"
+                      % (cls.__name__, ", ".join(unknown)))
 
+    parameters.update(params)
+    return parameters
 
-class ZScoreDetector(AnomalyDetector):
+
+  def handleBatch(self, values):
+    """
+    Returns the anomaly scores of the 1-D float64 array `values`, as if each
+    value had been passed to handleRecord() in order, probationary period
+    included.
+
+    By default this calls the class's scoreArray() with the instance's
+    parameters; subclasses without a scoreArray() MUST override it.
+    """
+    return self.scoreArray(values, math.ceil(self.probationaryPeriod),
+                           **{name: getattr(self, name)
+                              for name in self._parameters()})
+
+
+  def run(self):
+    ans = self.dataSet.data.copy()
+    scores = self.handleBatch(ans["value"].to_numpy(dtype=numpy.float64))
+
+    # Make sure anomalyScore is between 0 and 1
+    if not ((scores >= 0) & (scores <= 1)).all():
+      raise ValueError(
+        f"anomalyScore must be a number between 0 and 1. "
+        f"Please verify if '{self.handleBatch.__qualname__}' method is "
+        f"returning values between 0 and 1")
+
+    ans["anomaly_score"] = scores
+    return ans
+
+
+
+class ZScoreDetector(_BatchAnomalyDetector):
   """
   Sliding window Z-score detector.
 
   This detector outputs a smooth anomaly score using a logistic transform of
   the (absolute) z-score. The "threshold" parameter controls where the score
   crosses 0.5; NAB still optimizes a final threshold during the optimize step.
+
+  The window mean and sum of squared deviations (M2) are kept with a windowed
+  Welford update over a preallocated float64 ring buffer, so each record costs
+  O(1) regardless of the window size and long streams with large magnitudes do
+  not suffer from the cancellation of a sum / sum-of-squares formulation.
+
+  To bound the drift of the incremental updates without a periodic O(W)
+  recomputation, a second ("shadow") add-only Welford accumulates the values
+  written since the ring buffer head last wrapped. Each time the head wraps,
+  the shadow covers exactly the current window and replaces the incremental
+  statistics, so every record costs O(1).
   """
 
+  __slots__ = ("windowSize", "threshold", "scale", "minStd", "_invScale",
+               "_bias", "_buf", "_head", "_count", "_mean", "_m2",
+               "_shadowMean", "_shadowM2")
+
+  @staticmethod
+  def _parameters():
+    return {
+      "windowSize": int(os.environ.get("NAB_ZSCORE_WINDOW", "250")),
+      "threshold": float(os.environ.get("NAB_ZSCORE_THRESHOLD", "2.5")),
+      "scale": float(os.environ.get("NAB_ZSCORE_SCALE", "0.7")),
+      "minStd": float(os.environ.get("NAB_ZSCORE_MIN_STD", "1e-6"))}
+
+
   def __init__(self, *args, **kwargs):
     super(ZScoreDetector, self).__init__(*args, **kwargs)
 
-    self.windowSize = int(os.environ.get("NAB_ZSCORE_WINDOW", "250"))
-    self.threshold = float(os.environ.get("NAB_ZSCORE_THRESHOLD", "2.5"))
-    self.scale = float(os.environ.get("NAB_ZSCORE_SCALE", "0.7"))
-    self.minStd = float(os.environ.get("NAB_ZSCORE_MIN_STD", "1e-6"))
+    self._invScale, self._bias = _logisticCoefficients(self.threshold,
+                                                       self.scale)
 
-    self.window = deque(maxlen=self.windowSize)
-    self._recordIndex = 0
+    self._buf = _ringBuffer(self.windowSize)
+    self._head = 0
+    self._count = 0
+    self._mean = 0.0
+    self._m2 = 0.0
+    self._shadowMean = 0.0
+    self._shadowM2 = 0.0
 
 
-  def handleRecord(self, inputData):
+  def _handleRecordPython(self, inputData):
     score = 0.0
     value = inputData["value"]
+    windowSize = self.windowSize
+    head = self._head
+
+    # The windowed Welford / shadow recursion below is repeated in the
+    # pure-Python loop of scoreArray() and in _kernels.zscoreStep(); keep the
+    # three in step.
 
     # Score using past-only statistics (do not include current point in window
     # stats, otherwise anomalies are diluted).
-    if len(self.window) >= self.window.maxlen:
-      mean = sum(self.window) / len(self.window)
-      variance = sum((x - mean) ** 2 for x in self.window) / len(self.window)
-      std = math.sqrt(variance)
-      if std < self.minStd:
-        std = self.minStd
+    if self._count == windowSize:
+      mean = self._mean
+      std = math.sqrt(max(self._m2 / windowSize, self.minStd * self.minStd))
 
       z = abs((value - mean) / std)
-      score = _logisticScore(z, center=self.threshold, scale=self.scale)
-
-    self.window.append(value)
+      score = _logisticFromX(z * self._invScale + self._bias)
 
-    if self._recordIndex < self.probationaryPeriod:
-      score = 0.0
+      # Welford update replacing the oldest value in the window.
+      old = self._buf[head]
+      delta = value - old
+      self._mean = mean + delta / windowSize
+      self._m2 += delta * (value - self._mean + old - mean)
+    else:
+      self._count += 1
+      delta = value - self._mean
+      self._mean += delta / self._count
+      self._m2 += delta * (value - self._mean)
+
+    delta = value - self._shadowMean
+    self._shadowMean += delta / (head + 1)
+    self._shadowM2 += delta * (value - self._shadowMean)
+
+    self._buf[head] = value
+    head += 1
+    if head == windowSize:
+      head = 0
+      self._mean = self._shadowMean
+      self._m2 = self._shadowM2
+      self._shadowMean = 0.0
+      self._shadowM2 = 0.0
+    self._head = head
 
-    self._recordIndex += 1
     return (score, )
 
 
+  def _handleRecordKernel(self, inputData):
+    (score, self._head, self._count, self._mean, self._m2,
+     self._shadowMean, self._shadowM2) = _kernels.zscoreStep(
+      self._buf, self._head, self._count, self._mean, self._m2,
+      self._shadowMean, self._shadowM2, inputData["value"], self.windowSize,
+      self._invScale, self._bias, self.minStd)
+
+    return (score, )
 
-class EwmaDetector(AnomalyDetector):
+
+  handleRecord = (_handleRecordPython if _kernels is None
+                  else _handleRecordKernel)
+
+
+  @classmethod
+  def scoreArray(cls, values, probation, **params):
+    """Scores `values` in one windowed Welford pass."""
+    params = cls._scoreParameters(params)
+    windowSize = params["windowSize"]
+    minStd = params["minStd"]
+
+    if _kernels is not None:
+      invScale, bias = _logisticCoefficients(params["threshold"],
+                                             params["scale"])
+      return _kernels.zscoreScan(values, windowSize, invScale, bias, minStd,
+                                 probation)
+
+    # The same windowed Welford recursion as _handleRecordPython() and
+    # _kernels.zscoreStep() (keep the three in step), as a tight loop over
+    # Python floats; only the logistic transform is vectorized.
+    # (Per-window NumPy reductions would cost O(N * W) time and memory.)
+    z = numpy.zeros(len(values))
+    if len(values) > windowSize:
+      sqrt = math.sqrt
+      minVar = minStd * minStd
+      buf = [0.0] * windowSize
+      head = 0
+      mean = 0.0
+      m2 = 0.0
+      shadowMean = 0.0
+      shadowM2 = 0.0
+
+      for i, value in enumerate(values.tolist()):
+        if i >= windowSize:
+          z[i] = abs((value - mean) / sqrt(max(m2 / windowSize, minVar)))
+
+          old = buf[head]
+          delta = value - old
+          newMean = mean + delta / windowSize
+          m2 += delta * (value - newMean + old - mean)
+          mean = newMean
+        else:
+          delta = value - mean
+          mean += delta / (i + 1)
+          m2 += delta * (value - mean)
+
+        delta = value - shadowMean
+        shadowMean += delta / (head + 1)
+        shadowM2 += delta * (value - shadowMean)
+
+        buf[head] = value
+        head += 1
+        if head == windowSize:
+          head = 0
+          mean = shadowMean
+          m2 = shadowM2
+          shadowMean = 0.0
+          shadowM2 = 0.0
+
+    scores = _logisticScore(z, params["threshold"], params["scale"])
+    scores[:windowSize] = 0.0
+    scores[:probation] = 0.0
+    return scores
+
+
+
+class EwmaDetector(_BatchAnomalyDetector):
   """
   Exponentially Weighted Moving Average (EWMA) detector.
 
   The score is based on the standardized deviation from the EWMA, transformed
   via a logistic curve. `threshold` sets the 0.5 crossing point.
+
+  The variance follows the exponentially weighted Welford-style recursion
+  M2 <- (1 - alpha) * (M2 + alpha * diff^2), seeded from the second sample.
+
+  handleRecord() is pure Python even when numba is available: a record is only
+  a handful of float operations, cheaper than a call into a compiled kernel.
+  scoreArray() does use a compiled scan.
   """
 
+  __slots__ = ("alpha", "threshold", "scale", "minStd", "ewma", "variance",
+               "_recordIndex", "_invScale", "_bias")
+
+  @staticmethod
+  def _parameters():
+    return {
+      "alpha": float(os.environ.get("NAB_EWMA_ALPHA", "0.1")),
+      "threshold": float(os.environ.get("NAB_EWMA_THRESHOLD", "3.0")),
+      "scale": float(os.environ.get("NAB_EWMA_SCALE", "0.8")),
+      "minStd": float(os.environ.get("NAB_EWMA_MIN_STD", "1e-6"))}
+
+
   def __init__(self, *args, **kwargs):
     super(EwmaDetector, self).__init__(*args, **kwargs)
 
-    self.alpha = float(os.environ.get("NAB_EWMA_ALPHA", "0.1"))
-    self.threshold = float(os.environ.get("NAB_EWMA_THRESHOLD", "3.0"))
-    self.scale = float(os.environ.get("NAB_EWMA_SCALE", "0.8"))
-    self.minStd = float(os.environ.get("NAB_EWMA_MIN_STD", "1e-6"))
-
     self.ewma = None
     self.variance = 0.0
     self._recordIndex = 0
 
+    # Logistic coefficients of the per-record update, hoisted out of
+    # handleRecord.
+    self._invScale, self._bias = _logisticCoefficients(self.threshold,
+                                                       self.scale)
+
 
   def handleRecord(self, inputData):
     score = 0.0
     value = inputData["value"]
 
+    # The EWMA / variance recursion below is repeated in the pure-Python loop
+    # of scoreArray() and in _kernels.ewmaScan(); keep the three in step.
     if self.ewma is None:
       self.ewma = value
       self.variance = 0.0
+    elif self._recordIndex == 1:
+      # No spread estimate to score against yet: seed the variance with the
+      # first squared deviation instead of running the recursion from zero,
+      # which would keep std pinned to minStd for the first records.
+      diff = value - self.ewma
+      self.ewma += self.alpha * diff
+      self.variance = diff * diff
     else:
       # Score against the previous EWMA (prediction), then update state.
-      diff = value - self.ewma
-      std = math.sqrt(self.variance)
+      # This is the hot path, so the state is bound to locals and
+      # _logisticScore() is inlined.
+      alpha = self.alpha
+      ewma = self.ewma
+      variance = self.variance
+
+      diff = value - ewma
+      std = math.sqrt(variance)
       if std < self.minStd:
         std = self.minStd
 
       ratio = abs(diff) / std
-      score = _logisticScore(ratio, center=self.threshold, scale=self.scale)
-
-      self.ewma += self.alpha * diff
-      self.variance = (1 - self.alpha) * (self.variance + self.alpha * diff * diff)
+      if math.isfinite(ratio):
+        score = 0.5 + 0.5 * math.tanh(
+          0.5 * (ratio * self._invScale + self._bias))
 
-    if self._recordIndex < self.probationaryPeriod:
-      score = 0.0
+      self.ewma = ewma + alpha * diff
+      self.variance = (1.0 - alpha) * (variance + alpha * diff * diff)
 
     self._recordIndex += 1
     return (score, )
 
 
+  @classmethod
+  def scoreArray(cls, values, probation, **params):
+    """Scores `values` in one pass of the EWMA recursion."""
+    params = cls._scoreParameters(params)
+    alpha = params["alpha"]
+    minStd = params["minStd"]
+
+    if _kernels is not None:
+      invScale, bias = _logisticCoefficients(params["threshold"],
+                                             params["scale"])
+      return _kernels.ewmaScan(values, alpha, invScale, bias, minStd,
+                               probation)
+
+    # The recursion cannot be vectorized, so run it as a tight loop over
+    # Python floats and only vectorize the logistic transform. It repeats
+    # handleRecord() and _kernels.ewmaScan(); keep the three in step.
+    ratios = numpy.zeros(len(values))
+    if len(values) > 1:
+      oneMinusAlpha = 1.0 - alpha
+      sqrt = math.sqrt
+      points = values.tolist()
+
+      ewma = points[0]
+      diff = points[1] - ewma
+      ewma += alpha * diff
+      variance = diff * diff
+
+      for i in range(2, len(points)):
+        diff = points[i] - ewma
+        std = sqrt(variance)
+        if std < minStd:
+          std = minStd
 
-class AdaptiveThresholdDetector(AnomalyDetector):
+        ratios[i] = abs(diff) / std
+
+        ewma += alpha * diff
+        variance = oneMinusAlpha * (variance + alpha * diff * diff)
+
+    scores = _logisticScore(ratios, params["threshold"], params["scale"])
+    scores[:2] = 0.0
+    scores[:probation] = 0.0
+    return scores
+
+
+
+class AdaptiveThresholdDetector(_BatchAnomalyDetector):
   """
   Adaptive threshold detector using a sliding mean and max deviation.
 
   Computes ratio = |x - mean| / max_dev. `sensitivity` controls where the
   logistic-transformed score crosses 0.5.
+
+  The max deviation over the window is max(windowMax - mean, mean - windowMin);
+  the window max/min are tracked with monotonic deques and the mean with a
+  running sum, so each record costs amortized O(1). As in ZScoreDetector, a
+  shadow sum of the values written since the ring buffer head last wrapped
+  replaces the running sum at every wrap, bounding its floating point drift.
   """
 
+  __slots__ = ("windowSize", "sensitivity", "scale", "minDev", "_invScale",
+               "_bias", "_buf", "_maxQ", "_minQ", "_qPtr", "_maxDQ", "_minDQ",
+               "_head", "_count", "_sum", "_shadowSum", "_recordIndex")
+
+  @staticmethod
+  def _parameters():
+    return {
+      "windowSize": int(os.environ.get("NAB_ADAPTIVE_WINDOW", "100")),
+      "sensitivity": float(os.environ.get("NAB_ADAPTIVE_SENSITIVITY", "2.0")),
+      "scale": float(os.environ.get("NAB_ADAPTIVE_SCALE", "0.6")),
+      "minDev": float(os.environ.get("NAB_ADAPTIVE_MIN_DEV", "1e-6"))}
+
+
   def __init__(self, *args, **kwargs):
     super(AdaptiveThresholdDetector, self).__init__(*args, **kwargs)
 
-    self.windowSize = int(os.environ.get("NAB_ADAPTIVE_WINDOW", "100"))
-    self.sensitivity = float(os.environ.get("NAB_ADAPTIVE_SENSITIVITY", "2.0"))
-    self.scale = float(os.environ.get("NAB_ADAPTIVE_SCALE", "0.6"))
-    self.minDev = float(os.environ.get("NAB_ADAPTIVE_MIN_DEV", "1e-6"))
+    self._invScale, self._bias = _logisticCoefficients(self.sensitivity,
+                                                       self.scale)
 
-    self.window = deque(maxlen=self.windowSize)
+    self._buf = _ringBuffer(self.windowSize)
+    if _kernels is not None:
+      # Monotonic queues of record indices for the kernel, see
+      # _kernels.adaptiveStep().
+      self._maxQ = numpy.zeros(self.windowSize, dtype=numpy.int64)
+      self._minQ = numpy.zeros(self.windowSize, dtype=numpy.int64)
+      self._qPtr = numpy.zeros(4, dtype=numpy.int64)
+    else:
+      # (value, recordIndex) pairs; values are non-increasing in _maxDQ and
+      # non-decreasing in _minDQ, so the fronts are the window max and min.
+      self._maxDQ = deque()
+      self._minDQ = deque()
+    self._head = 0
+    self._count = 0
+    self._sum = 0.0
+    self._shadowSum = 0.0
     self._recordIndex = 0
 
 
-  def handleRecord(self, inputData):
+  def _handleRecordPython(self, inputData):
     score = 0.0
     value = inputData["value"]
+    windowSize = self.windowSize
+    head = self._head
+    i = self._recordIndex
+
+    # The running sum / shadow sum / monotonic deque recursion below is
+    # repeated in the pure-Python loop of scoreArray() and (with index queues)
+    # in _kernels.adaptiveStep(); keep the three in step.
 
     # Score using past-only window statistics.
-    if len(self.window) >= self.window.maxlen:
-      mean = sum(self.window) / len(self.window)
-      maxDev = max(abs(x - mean) for x in self.window)
+    if self._count == windowSize:
+      mean = self._sum / windowSize
+      maxDev = max(self._maxDQ[0][0] - mean, mean - self._minDQ[0][0])
       if maxDev < self.minDev:
         maxDev = self.minDev
 
       ratio = abs(value - mean) / maxDev
-      score = _logisticScore(ratio, center=self.sensitivity, scale=self.scale)
+      score = _logisticFromX(ratio * self._invScale + self._bias)
 
-    self.window.append(value)
+      self._sum += value - self._buf[head]
+    else:
+      self._sum += value
+      self._count += 1
+
+    self._shadowSum += value
+    self._buf[head] = value
+    head += 1
+    if head == windowSize:
+      head = 0
+      self._sum = self._shadowSum
+      self._shadowSum = 0.0
+    self._head = head
+
+    maxDQ = self._maxDQ
+    while maxDQ and maxDQ[-1][0] < value:
+      maxDQ.pop()
+    maxDQ.append((value, i))
+    if maxDQ[0][1] <= i - windowSize:
+      maxDQ.popleft()
+
+    minDQ = self._minDQ
+    while minDQ and minDQ[-1][0] > value:
+      minDQ.pop()
+    minDQ.append((value, i))
+    if minDQ[0][1] <= i - windowSize:
+      minDQ.popleft()
+
+    self._recordIndex = i + 1
+    return (score, )
 
-    if self._recordIndex < self.probationaryPeriod:
-      score = 0.0
 
-    self._recordIndex += 1
+  def _handleRecordKernel(self, inputData):
+    i = self._recordIndex
+    score, self._sum, self._shadowSum = _kernels.adaptiveStep(
+      self._buf, self._maxQ, self._minQ, self._qPtr, self._sum,
+      self._shadowSum, inputData["value"], i, self.windowSize,
+      self._invScale, self._bias, self.minDev)
+
+    self._recordIndex = i + 1
     return (score, )
+
+
+  handleRecord = (_handleRecordPython if _kernels is None
+                  else _handleRecordKernel)
+
+
+  @classmethod
+  def scoreArray(cls, values, probation, **params):
+    """Scores `values` in one pass of the sliding sum and extrema."""
+    params = cls._scoreParameters(params)
+    windowSize = params["windowSize"]
+    minDev = params["minDev"]
+
+    if _kernels is not None:
+      invScale, bias = _logisticCoefficients(params["sensitivity"],
+                                             params["scale"])
+      return _kernels.adaptiveScan(values, windowSize, invScale, bias, minDev,
+                                   probation)
+
+    # The same running sum, shadow sum and monotonic deques as
+    # _handleRecordPython() and _kernels.adaptiveStep() (keep the three in
+    # step), as a tight loop over Python floats; only the logistic transform
+    # is vectorized.
+    ratios = numpy.zeros(len(values))
+    if len(values) > windowSize:
+      buf = [0.0] * windowSize
+      maxDQ = deque()
+      minDQ = deque()
+      head = 0
+      s = 0.0
+      shadow = 0.0
+
+      for i, value in enumerate(values.tolist()):
+        if i >= windowSize:
+          mean = s / windowSize
+          maxDev = max(maxDQ[0][0] - mean, mean - minDQ[0][0])
+          if maxDev < minDev:
+            maxDev = minDev
+
+          ratios[i] = abs(value - mean) / maxDev
+          s += value - buf[head]
+        else:
+          s += value
+
+        shadow += value
+        buf[head] = value
+        head += 1
+        if head == windowSize:
+          head = 0
+          s = shadow
+          shadow = 0.0
+
+        while maxDQ and maxDQ[-1][0] < value:
+          maxDQ.pop()
+        maxDQ.append((value, i))
+        if maxDQ[0][1] <= i - windowSize:
+          maxDQ.popleft()
+
+        while minDQ and minDQ[-1][0] > value:
+          minDQ.pop()
+        minDQ.append((value, i))
+        if minDQ[0][1] <= i - windowSize:
+          minDQ.popleft()
+
+    scores = _logisticScore(ratios, params["sensitivity"], params["scale"])
+    scores[:windowSize] = 0.0
+    scores[:probation] = 0.0
+    return scores
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import math
 import os
 import sys
 try:
@@ -23,27 +24,92 @@ def _loadEnvFile(path):
   if not path or not os.path.exists(path):
     return
 
-  with open(path) as f:
-    for rawLine in f:
-      line = rawLine.strip()
-      if not line or line.startswith("#"):
-        continue
-      if line.startswith("export "):
-        line = line[len("export "):].strip()
-      if "=" not in line:
-        continue
+  with open(path, encoding="utf-8") as f:
+    data = f.read()
 
-      key, value = line.split("=", 1)
-      key = key.strip()
-      value = value.strip()
+  for line in data.splitlines():
+    line = line.strip()
+    if not line or line[0] == "#":
+      continue
+    if line.startswith("export "):
+      line = line[len("export "):].lstrip()
 
-      if (len(value) >= 2
-          and value[0] == value[-1]
-          and value[0] in ("'", '"')):
-        value = value[1:-1]
+    key, sep, value = line.partition("=")
+    if not sep:
+      continue
 
-      if key:
-        os.environ[key] = value
+    key = key.strip()
+    value = value.strip()
+
+    if (len(value) >= 2
+        and value[0] == value[-1]
+        and value[0] in ("'", '"')):
+      value = value[1:-1]
+
+    if key:
+      os.environ[key] = value
+
+
+def _detectFile(args):
+  """
+  Pool task of _detectArrays(): score one data file with each detector's
+  scoreArray() and write the usual per-detector result file
+  (results/<name>/<category>/<name>_<file>.csv) for each of them.
+  """
+  from nab.util import createPath
+
+  (i, detectors, data, labels, probation, resultsDir, relativePath) = args
+
+  relativeDir, fileName = os.path.split(relativePath)
+  values = data["value"].to_numpy(dtype="float64")
+
+  for name, detectorClass in detectors:
+    scores = detectorClass.scoreArray(values, probation)
+
+    # Make sure anomalyScore is between 0 and 1, as AnomalyDetector.run() does.
+    if not ((scores >= 0) & (scores <= 1)).all():
+      raise ValueError(
+        f"anomalyScore must be a number between 0 and 1. "
+        f"Please verify if '{detectorClass.scoreArray.__qualname__}' method "
+        f"is returning values between 0 and 1")
+
+    results = data.assign(anomaly_score=scores, label=labels)
+
+    outputPath = os.path.join(resultsDir, name, relativeDir,
+                              name + "_" + fileName)
+    createPath(outputPath)
+    results.to_csv(outputPath, index=False)
+
+  print("%s: Results have been written for %s" % (i, relativePath))
+
+
+def _detectArrays(runner, detectors):
+  """
+  Detection step for detector classes that provide scoreArray(): like
+  Runner.detect(), but each data file's values are scored as one array by all
+  the detectors at once, without constructing a detector per file and
+  dispatching its records.
+  """
+  from nab.util import getProbationPeriod
+
+  print("\nRunning detection step")
+
+  args = []
+  for relativePath, dataSet in runner.corpus.dataFiles.items():
+    if relativePath in runner.corpusLabel.labels:
+      probation = math.ceil(getProbationPeriod(runner.probationaryPercent,
+                                               len(dataSet.data)))
+      args.append((len(args),
+                   list(detectors.items()),
+                   dataSet.data,
+                   runner.corpusLabel.labels[relativePath]["label"],
+                   probation,
+                   runner.resultsDir,
+                   relativePath))
+
+  # Using `map_async` instead of `map` so interrupts are properly handled, as
+  # in Runner.detect().
+  runner.pool.map_async(_detectFile, args).get(999999)
 
 
 def main(args):
@@ -54,6 +120,10 @@ def main(args):
     envFile = os.path.join(root, envFile)
   _loadEnvFile(envFile)
 
+  # Keep numba's compiled kernels with the repo so later runs load them from
+  # disk instead of recompiling.
+  os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(root, ".numba_cache"))
+
   from nab.runner import Runner
   from nab.detectors.simple_stats.simple_stats_detectors import (
     ZScoreDetector,
@@ -93,7 +163,27 @@ def main(args):
   thresholds = None
 
   if args.detect:
-    runner.detect(detectorConstructors)
+    # Detectors with a scoreArray() skip the per-file detector instances.
+    arrayDetectors = {name: detectorClass
+                      for name, detectorClass in detectorConstructors.items()
+                      if hasattr(detectorClass, "scoreArray")}
+    if arrayDetectors:
+      # Compile the numba kernels of this path once here, into numba's on-disk
+      # cache, so the pool's workers load them instead of each compiling them.
+      try:
+        from nab.detectors.simple_stats._kernels import warmup
+      except ImportError:
+        pass
+      else:
+        warmup()
+
+      _detectArrays(runner, arrayDetectors)
+
+    otherDetectors = {name: detectorClass
+                      for name, detectorClass in detectorConstructors.items()
+                      if name not in arrayDetectors}
+    if otherDetectors:
+      runner.detect(otherDetectors)
 
   if args.optimize:
     thresholds = runner.optimize(detectorNames)
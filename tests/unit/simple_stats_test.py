@@ -0,0 +1,143 @@
+"""Tests the simple stats detectors' batch and streaming code paths."""
+
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy
+
+from nab.corpus import DataFile
+from nab.detectors import simple_stats
+from nab.detectors.simple_stats import simple_stats_detectors
+from nab.detectors.simple_stats.simple_stats_detectors import (
+  AdaptiveThresholdDetector,
+  EwmaDetector,
+  ZScoreDetector)
+from nab.util import recur
+
+depth = 3
+
+root = recur(os.path.dirname, os.path.realpath(__file__), depth)
+
+DETECTORS = (ZScoreDetector, EwmaDetector, AdaptiveThresholdDetector)
+
+
+
+def _loadWithoutKernels():
+  """
+  Returns a separate copy of simple_stats_detectors loaded as if numba were
+  not installed, so its detectors use the pure-Python implementations.
+  """
+  blocked = {"numba": None, simple_stats.__name__ + "._kernels": None}
+  with mock.patch.dict(sys.modules, blocked), \
+       mock.patch.dict(simple_stats.__dict__):
+    simple_stats.__dict__.pop("_kernels", None)
+
+    spec = importlib.util.spec_from_file_location(
+      simple_stats_detectors.__name__ + "_python",
+      simple_stats_detectors.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+  return module
+
+
+
+class SimpleStatsTest(unittest.TestCase):
+
+  def setUp(self):
+    self.dataSet = DataFile(os.path.join(
+      root, "tests", "test_data", "realAWSCloudwatch",
+      "ec2_cpu_utilization_5f5533.csv"))
+
+
+  def _streamScores(self, detector):
+    return numpy.array([detector.handleRecord(row)[0]
+                        for row in self.dataSet.data.to_dict("records")])
+
+
+  def testBatchMatchesStreaming(self):
+    """handleBatch() reproduces the per-record scores of handleRecord()."""
+    for windowSize in ("7", "250"):
+      env = {"NAB_ZSCORE_WINDOW": windowSize,
+             "NAB_ADAPTIVE_WINDOW": windowSize}
+      with mock.patch.dict(os.environ, env):
+        for detectorClass in DETECTORS:
+          values = self.dataSet.data["value"].to_numpy(dtype=numpy.float64)
+          batch = detectorClass(self.dataSet, 0.15).handleBatch(values)
+          stream = self._streamScores(detectorClass(self.dataSet, 0.15))
+
+          numpy.testing.assert_allclose(
+            batch, stream, rtol=0, atol=1e-6,
+            err_msg="%s (window %s)" % (detectorClass.__name__, windowSize))
+
+
+  def testScoreArray(self):
+    """scoreArray() with explicit parameters matches a configured detector."""
+    values = self.dataSet.data["value"].to_numpy(dtype=numpy.float64)
+    params = {ZScoreDetector: {"windowSize": 7, "threshold": 2.0},
+              EwmaDetector: {"alpha": 0.3, "minStd": 1e-3},
+              AdaptiveThresholdDetector: {"windowSize": 7, "scale": 0.5}}
+    env = {"NAB_ZSCORE_WINDOW": "7",
+           "NAB_ZSCORE_THRESHOLD": "2.0",
+           "NAB_EWMA_ALPHA": "0.3",
+           "NAB_EWMA_MIN_STD": "1e-3",
+           "NAB_ADAPTIVE_WINDOW": "7",
+           "NAB_ADAPTIVE_SCALE": "0.5"}
+
+    for detectorClass in DETECTORS:
+      with mock.patch.dict(os.environ, env):
+        detector = detectorClass(self.dataSet, 0.15)
+        expected = detector.handleBatch(values)
+
+      scores = detectorClass.scoreArray(
+        values, int(detector.probationaryPeriod), **params[detectorClass])
+      numpy.testing.assert_array_equal(
+        scores, expected, err_msg=detectorClass.__name__)
+
+    with self.assertRaises(TypeError):
+      ZScoreDetector.scoreArray(values, 0, window=7)
+
+
+  def testPythonFallbackMatchesKernels(self):
+    """Without numba, both code paths give the kernel-backed scores."""
+    python = _loadWithoutKernels()
+    self.assertIsNone(python._kernels)
+
+    values = self.dataSet.data["value"].to_numpy(dtype=numpy.float64)
+    with mock.patch.dict(os.environ, {"NAB_ZSCORE_WINDOW": "7",
+                                      "NAB_ADAPTIVE_WINDOW": "7"}):
+      for detectorClass in DETECTORS:
+        fallbackClass = getattr(python, detectorClass.__name__)
+        expected = self._streamScores(detectorClass(self.dataSet, 0.15))
+
+        stream = self._streamScores(fallbackClass(self.dataSet, 0.15))
+        batch = fallbackClass(self.dataSet, 0.15).handleBatch(values)
+
+        numpy.testing.assert_allclose(
+          stream, expected, rtol=0, atol=1e-9,
+          err_msg="%s streaming" % detectorClass.__name__)
+        numpy.testing.assert_allclose(
+          batch, expected, rtol=0, atol=1e-6,
+          err_msg="%s batch" % detectorClass.__name__)
+
+
+  def testRunOutput(self):
+    """run() returns in-range scores with the standard NAB result columns."""
+    for detectorClass in DETECTORS:
+      detector = detectorClass(self.dataSet, 0.15)
+      results = detector.run()
+
+      self.assertEqual(list(results.columns), detector.getHeader())
+      self.assertEqual(len(results), len(self.dataSet.data))
+      self.assertTrue((results["anomaly_score"] >= 0).all())
+      self.assertTrue((results["anomaly_score"] <= 1).all())
+      self.assertTrue(
+        (results["anomaly_score"][:detector.probationaryPeriod] == 0).all())
+
+
+
+if __name__ == '__main__':
+  unittest.main()